@@ -4,11 +4,12 @@ Script para gerar documentação Swagger automaticamente, incluindo
 Bearer Token security e server base.
 """
 
-import json
 import os
 import sys
 from pathlib import Path
 
+import orjson
+
 # Adiciona o diretório raiz do projeto ao PYTHONPATH
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
@@ -70,8 +71,9 @@ def generate_swagger_docs():
 
         # Salva o JSON do Swagger
         swagger_file = docs_dir / "swagger.json"
-        with open(swagger_file, "w", encoding="utf-8") as f:
-            json.dump(openapi_schema, f, indent=2, ensure_ascii=False)
+        swagger_file.write_bytes(
+            orjson.dumps(openapi_schema, option=orjson.OPT_INDENT_2)
+        )
 
         # Gera um HTML simples para visualização local
         html_content = f"""<!DOCTYPE html>
@@ -105,8 +107,7 @@ def generate_swagger_docs():
 </html>"""
 
         html_file = docs_dir / "index.html"
-        with open(html_file, "w", encoding="utf-8") as f:
-            f.write(html_content)
+        html_file.write_text(html_content, encoding="utf-8")
 
         print("✅ Documentação Swagger gerada com sucesso!")
         print(f"📄 JSON: {swagger_file}")
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
 from time import perf_counter
 from loguru import logger
 
@@ -9,8 +9,8 @@ from src.helpers.vectorstore import cleanup_old_chunks, get_collection_stats
 
 router = APIRouter(prefix="/api/v1", tags=["web_search"])
 
-@router.post("/web_search", response_model=WebSearchResponse)
-async def web_search_endpoint(req: WebSearchRequest):
+@router.post("/web_search", response_model=WebSearchResponse, response_class=ORJSONResponse)
+async def web_search_endpoint(req: WebSearchRequest, response: Response):
     logger.info(f"API: Web search request received - query: '{req.query}', k: {req.k}, lang: {req.lang}")
     start_time = perf_counter()
     
@@ -20,28 +20,24 @@ async def web_search_endpoint(req: WebSearchRequest):
         
         logger.info(f"API: Web search completed in {process_time:.4f}s - summary length: {len(resp.summary)}, sources: {len(resp.sources)}")
         
-        return JSONResponse(
-            content=resp.model_dump(mode="json"),
-            headers={"X-Process-Time": f"{process_time:.4f}"}
-        )
+        response.headers["X-Process-Time"] = f"{process_time:.4f}"
+        return resp
         
     except Exception as e:
         process_time = perf_counter() - start_time
         logger.error(f"API: Web search failed after {process_time:.4f}s - error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/web_search/context", response_model=WebSearchContextResponse)
-async def web_search_context_endpoint(req: WebSearchRequest):
+@router.post("/web_search/context", response_model=WebSearchContextResponse, response_class=ORJSONResponse)
+async def web_search_context_endpoint(req: WebSearchRequest, response: Response):
     start_time = perf_counter()
     try:
         resp = await web_search_context(req)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     process_time = perf_counter() - start_time
-    return JSONResponse(
-        content=resp.model_dump(mode="json"),
-        headers={"X-Process-Time": f"{process_time:.4f}"},
-    )
+    response.headers["X-Process-Time"] = f"{process_time:.4f}"
+    return resp
 
 
 @router.get("/admin/collection-stats")
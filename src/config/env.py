@@ -1,25 +1,36 @@
+import sys
+
 from src.utils.infisical import getenv_or_action, mask_string
 from loguru import logger
 
-# Log environment configuration on import
-logger.info("Loading environment configuration...")
+# DEBUG lines on the request hot paths are skipped unless explicitly enabled
+LOG_LEVEL = getenv_or_action("LOG_LEVEL", action="ignore", default="INFO").upper()
+logger.remove()
+logger.add(sys.stderr, level=LOG_LEVEL)
 
 QDRANT_URL = getenv_or_action("QDRANT_URL")
-logger.info(f"QDRANT_URL: {QDRANT_URL}")
-
+QDRANT_PREFER_GRPC = getenv_or_action("QDRANT_PREFER_GRPC", action="ignore", default="true").lower() in ("1", "true", "yes")
+QDRANT_GRPC_PORT = int(getenv_or_action("QDRANT_GRPC_PORT", action="ignore", default="6334"))
 COLL = getenv_or_action("COLL")
-logger.info(f"COLL: {COLL}")
-
 CRAWL_URL = getenv_or_action("CRAWL_URL")
-logger.info(f"CRAWL_URL: {CRAWL_URL}")
-
+CRAWL_CONCURRENCY = int(getenv_or_action("CRAWL_CONCURRENCY", action="ignore", default="5"))
 SEARX_URL = getenv_or_action("SEARX_URL")
-logger.info(f"SEARX_URL: {SEARX_URL}")
-
 GEMINI_API_KEY = getenv_or_action("GEMINI_API_KEY")
-logger.info(f"GEMINI_API_KEY: {mask_string(GEMINI_API_KEY) if GEMINI_API_KEY else 'NOT SET'}")
 
 # SECRET_KEY_SEARXNG = getenv_or_action("SECRET_KEY_SEARXNG")
-# logger.info(f"SECRET_KEY_SEARXNG: {mask_string(SECRET_KEY_SEARXNG) if SECRET_KEY_SEARXNG else 'NOT SET'}")
 
-logger.info("Environment configuration loaded successfully")
\ No newline at end of file
+# Log environment configuration on import (single dispatch)
+logger.info(
+    "Environment configuration loaded: {}",
+    {
+        "LOG_LEVEL": LOG_LEVEL,
+        "QDRANT_URL": QDRANT_URL,
+        "QDRANT_PREFER_GRPC": QDRANT_PREFER_GRPC,
+        "QDRANT_GRPC_PORT": QDRANT_GRPC_PORT,
+        "COLL": COLL,
+        "CRAWL_URL": CRAWL_URL,
+        "CRAWL_CONCURRENCY": CRAWL_CONCURRENCY,
+        "SEARX_URL": SEARX_URL,
+        "GEMINI_API_KEY": mask_string(GEMINI_API_KEY) if GEMINI_API_KEY else "NOT SET",
+    },
+)
@@ -4,11 +4,8 @@ import asyncio, re
 # Regex simples para identificar sentenças. Não depende de bibliotecas externas.
 _SENT_SPLIT = re.compile(r"(?<=[.!?])\s+")
 
-
-async def _yield_every(n: int):
-    """Força o event-loop a respirar a cada *n* iterações."""
-    if n % 100 == 0:
-        await asyncio.sleep(0)
+# Devolve o controle ao event-loop a cada 128 sentenças (máscara de bits).
+_YIELD_MASK = 127
 
 
 async def chunk_markdown(md: str, max_tokens: int = 500, overlap_tokens: int = 100, min_tokens: int = 50):
@@ -19,27 +16,37 @@ async def chunk_markdown(md: str, max_tokens: int = 500, overlap_tokens: int = 1
     min_tokens: descarta chunks menores que esse valor (ruído).
     """
 
+    # Texto com até max_tokens caracteres tem no máximo max_tokens palavras e
+    # cabe num único chunk: dispensa a divisão em sentenças.
+    if len(md) <= max_tokens:
+        words = md.split()
+        return [" ".join(words)] if len(words) >= min_tokens else []
+
     sentences = _SENT_SPLIT.split(md)
     chunks: list[str] = []
     curr_words: list[str] = []
 
     for idx, sent in enumerate(sentences):
-        words = sent.strip().split()
+        words = sent.split()
         if not words:
             continue
 
         if len(curr_words) + len(words) > max_tokens:
             if len(curr_words) >= min_tokens:
-                chunks.append(" ".join(curr_words).strip())
+                chunks.append(" ".join(curr_words))
+
+            # Mantém apenas a cauda de sobreposição, sem copiar a lista
+            if overlap_tokens:
+                del curr_words[:-overlap_tokens]
+            else:
+                curr_words.clear()
 
-            overlap = curr_words[-overlap_tokens:] if overlap_tokens else []
-            curr_words = overlap + words
-        else:
-            curr_words.extend(words)
+        curr_words.extend(words)
 
-        await _yield_every(idx)
+        if not idx & _YIELD_MASK:
+            await asyncio.sleep(0)
 
     if len(curr_words) >= min_tokens:
-        chunks.append(" ".join(curr_words).strip())
+        chunks.append(" ".join(curr_words))
 
     return chunks
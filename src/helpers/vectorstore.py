@@ -1,12 +1,18 @@
 from qdrant_client import AsyncQdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue, Range
+from qdrant_client.http.models import (
+    Distance, VectorParams, Batch, Filter, FieldCondition, MatchValue, MatchAny, Range, QueryRequest, SearchParams, PayloadSchemaType,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+)
 from google import genai
-import uuid, time
+from cachetools import TTLCache
+from array import array
+import asyncio, hashlib, os, uuid, time
 from loguru import logger
 
-from src.config.env import QDRANT_URL, COLL, GEMINI_API_KEY
+from src.config.env import QDRANT_URL, QDRANT_PREFER_GRPC, QDRANT_GRPC_PORT, COLL, GEMINI_API_KEY
 
-client = AsyncQdrantClient(url=QDRANT_URL)
+# gRPC sends vectors as packed float32 instead of JSON number arrays
+client = AsyncQdrantClient(url=QDRANT_URL, prefer_grpc=QDRANT_PREFER_GRPC, grpc_port=QDRANT_GRPC_PORT)
 
 # Initialize Gemini client for embeddings
 logger.info("Initializing Gemini client for embeddings...")
@@ -21,32 +27,121 @@ except Exception as e:
 EMBEDDING_MODEL = "text-embedding-004"
 EMBEDDING_DIMENSION = 768  # text-embedding-004 dimension
 
-async def encode_texts_async(texts: list[str]):
-    """Generate embeddings using Gemini API"""
-    logger.debug(f"Starting Gemini embedding generation for {len(texts)} texts")
+# Gemini embed_content accepts at most 100 inputs per request
+EMBED_BATCH_SIZE = 100
+EMBED_CONCURRENCY = 5
+_embed_semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+# Payload fields filtered by retrieve(), cleanup_old_chunks() and the
+# stored-embedding lookup in index_chunks()
+PAYLOAD_INDEXES = {
+    "query_id": PayloadSchemaType.KEYWORD,
+    "timestamp": PayloadSchemaType.INTEGER,
+    "content_hash": PayloadSchemaType.KEYWORD,
+}
+
+# Max points per Qdrant upsert request
+UPSERT_BATCH_SIZE = 256
+
+# A query_id only matches the few hundred chunks of one crawl, so an exact scan
+# over the filtered points beats walking the HNSW graph for them
+QUERY_SEARCH_PARAMS = SearchParams(exact=True)
+
+# Content-addressed embedding cache shared by chunks and queries. Vectors are
+# stored as float32 arrays (~3KB each instead of ~25KB as a list of floats).
+EMBEDDING_CACHE_SIZE = 20_000
+EMBEDDING_CACHE_TTL = 24 * 3600  # seconds
+_embedding_cache: TTLCache = TTLCache(maxsize=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL)
+
+
+def _embedding_key(text: str) -> tuple[str, bytes]:
+    """Cache key for *text* under the current embedding model."""
+    return EMBEDDING_MODEL, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+async def _load_stored_embeddings(keys: list[tuple[str, bytes]]):
+    """Seed the embedding cache with vectors already stored in Qdrant.
+
+    Chunks indexed by earlier queries (on any replica) carry their content
+    hash and embedding model, so cache misses are looked up there before
+    paying for Gemini. Points stored by a different model never match.
+    Vectors come back normalized (the collection uses cosine distance),
+    which does not change cosine scores.
+    """
+    missing = {key[1].hex(): key for key in keys if key not in _embedding_cache}
+    if not missing:
+        return
+
+    # The same text may be stored once per query that indexed it, so one hash can
+    # fill a page: keep paging, filtering each page to the hashes still missing
+    offset = None
     try:
-        # Use Gemini embedding API
+        while missing:
+            points, offset = await client.scroll(
+                collection_name=COLL,
+                scroll_filter=Filter(must=[
+                    FieldCondition(key="content_hash", match=MatchAny(any=list(missing))),
+                    FieldCondition(key="embedding_model", match=MatchValue(value=EMBEDDING_MODEL)),
+                ]),
+                limit=len(missing),
+                offset=offset,
+                with_payload=["content_hash"],
+                with_vectors=True,
+            )
+            for point in points:
+                key = missing.pop(point.payload.get("content_hash"), None)
+                if key is not None:
+                    _embedding_cache[key] = array("f", point.vector)
+            if offset is None:
+                break
+    except Exception as e:
+        logger.warning(f"Could not look up stored embeddings: {e}")
+
+    logger.debug("Stored embeddings found in Qdrant; {} texts still need Gemini", len(missing))
+
+
+# Serializes the collection check/creation across concurrent requests
+_collection_lock = asyncio.Lock()
+# Set once the collection is known to exist, so later calls skip Qdrant
+_collection_ready = False
+
+async def _embed_batch(texts: list[str]) -> list[list[float]]:
+    """Embed one batch of texts with a single Gemini call"""
+    async with _embed_semaphore:
         response = await gemini_client.aio.models.embed_content(
             model=EMBEDDING_MODEL,
             contents=texts
         )
-        
-        # Extract embeddings from response
-        logger.debug(f"Response structure: {type(response.embeddings[0])}")
-        logger.debug(f"Available attributes: {dir(response.embeddings[0])}")
-        
-        # Try different attribute names
-        if hasattr(response.embeddings[0], 'values'):
-            embeddings = [item.values for item in response.embeddings]
-        elif hasattr(response.embeddings[0], 'vector'):
-            embeddings = [item.vector for item in response.embeddings]
-        else:
-            # Print first item for debugging
-            logger.error(f"First embedding item: {response.embeddings[0]}")
-            raise Exception("Cannot find embedding attribute")
+
+    return [item.values for item in response.embeddings]
+
+async def encode_texts_async(texts: list[str], keys: list[tuple[str, bytes]] | None = None):
+    """Generate embeddings using Gemini API, only for texts not already cached.
+
+    Callers that already hashed the texts pass the matching *keys* so each
+    text is hashed once.
+    """
+    if keys is None:
+        keys = [_embedding_key(t) for t in texts]
+    cached = [_embedding_cache.get(k) for k in keys]
+    missing = [i for i, vec in enumerate(cached) if vec is None]
+
+    if not missing:
+        logger.debug("All {} embeddings served from cache", len(texts))
+        return [vec.tolist() for vec in cached]
+
+    logger.debug("Starting Gemini embedding generation for {} texts ({} cached)", len(missing), len(texts) - len(missing))
+    try:
+        # Gemini limits inputs per request: split into batches sent concurrently
+        missing_texts = [texts[i] for i in missing]
+        batches = [missing_texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(missing_texts), EMBED_BATCH_SIZE)]
+        results = await asyncio.gather(*(_embed_batch(b) for b in batches))
+        embeddings = [values for batch in results for values in batch]
             
-        logger.debug(f"Successfully generated {len(embeddings)} embeddings via Gemini")
-        return embeddings
+        logger.debug("Successfully generated {} embeddings via Gemini in {} batches", len(embeddings), len(batches))
+        for i, values in zip(missing, embeddings):
+            cached[i] = _embedding_cache[keys[i]] = array("f", values)
+        return [vec.tolist() for vec in cached]
         
     except Exception as e:
         logger.error(f"Error generating embeddings via Gemini: {e}")
@@ -54,6 +149,12 @@ async def encode_texts_async(texts: list[str]):
 
 async def encode_text_async(text: str):
     """Generate single text embedding using Gemini API"""
+    key = _embedding_key(text)
+    cached = _embedding_cache.get(key)
+    if cached is not None:
+        logger.debug("Single text embedding served from cache")
+        return cached.tolist()
+
     logger.debug("Starting Gemini embedding generation for single text")
     try:
         # Use Gemini embedding API for single text
@@ -63,6 +164,7 @@ async def encode_text_async(text: str):
         )
         
         embedding = response.embeddings[0].values
+        _embedding_cache[key] = array("f", embedding)
         logger.debug("Successfully generated single embedding via Gemini")
         return embedding
         
@@ -71,22 +173,47 @@ async def encode_text_async(text: str):
         raise
 
 async def ensure_collection():
+    global _collection_ready
+
+    if _collection_ready:
+        return
+
     logger.info(f"Ensuring collection '{COLL}' exists in Qdrant at {QDRANT_URL}")
     try:
-        collections_resp = await client.get_collections()
-        cols = [c.name for c in collections_resp.collections]
-        logger.info(f"Existing collections: {cols}")
-        
-        if COLL not in cols:
-            logger.info(f"Creating new collection '{COLL}'")
-            await client.recreate_collection(
-                collection_name=COLL,
-                vectors_config=VectorParams(size=EMBEDDING_DIMENSION,
-                                           distance=Distance.COSINE),
-            )
-            logger.info(f"Collection '{COLL}' created successfully")
-        else:
-            logger.info(f"Collection '{COLL}' already exists")
+        async with _collection_lock:
+            if _collection_ready:
+                return
+
+            if await client.collection_exists(COLL):
+                logger.info(f"Collection '{COLL}' already exists")
+            else:
+                logger.info(f"Creating new collection '{COLL}'")
+                await client.create_collection(
+                    collection_name=COLL,
+                    vectors_config=VectorParams(size=EMBEDDING_DIMENSION,
+                                               distance=Distance.COSINE),
+                    # int8 copies kept in RAM for search (4x smaller than float32);
+                    # Qdrant rescores the top candidates with the original vectors
+                    quantization_config=ScalarQuantization(
+                        scalar=ScalarQuantizationConfig(
+                            type=ScalarType.INT8,
+                            quantile=0.99,
+                            always_ram=True,
+                        ),
+                    ),
+                )
+                logger.info(f"Collection '{COLL}' created successfully")
+
+            # Payload indexes for the fields every search/cleanup filters on.
+            # Idempotent, so collections created before them get indexed too.
+            for field_name, field_schema in PAYLOAD_INDEXES.items():
+                await client.create_payload_index(
+                    collection_name=COLL,
+                    field_name=field_name,
+                    field_schema=field_schema,
+                )
+            logger.info(f"Payload indexes ensured: {list(PAYLOAD_INDEXES)}")
+            _collection_ready = True
             
     except Exception as e:
         logger.error(f"Error ensuring collection: {e}")
@@ -103,28 +230,45 @@ async def index_chunks(chunks, query_id: str):
     try:
         logger.debug("Encoding chunks with Gemini embeddings")
         texts = [c["text"] for c in chunks]
-        vecs = await encode_texts_async(texts)
-        logger.debug(f"Generated {len(vecs)} embeddings")
+        keys = [_embedding_key(t) for t in texts]
+        await _load_stored_embeddings(keys)
+        vecs = await encode_texts_async(texts, keys)
+        logger.debug("Generated {} embeddings", len(vecs))
         
         current_timestamp = int(time.time())
-        points = [
-            PointStruct(
-                id=str(uuid.uuid4()),
-                vector=v,  # Gemini embeddings are already lists
-                payload={
-                    "url": c["url"],
-                    "title": c["title"],
-                    "text": c["text"],
-                    "query_id": query_id,
-                    "timestamp": current_timestamp,
-                },
-            )
-            for c, v in zip(chunks, vecs)
+        # One entropy read for every point id (still valid UUIDv4s)
+        raw = os.urandom(16 * len(chunks))
+        ids = [uuid.UUID(bytes=raw[i:i + 16], version=4).hex for i in range(0, len(raw), 16)]
+        payloads = [
+            {
+                "url": c["url"],
+                "title": c["title"],
+                "text": c["text"],
+                "query_id": query_id,
+                "timestamp": current_timestamp,
+                "content_hash": key[1].hex(),
+                "embedding_model": key[0],
+            }
+            for c, key in zip(chunks, keys)
         ]
         
-        logger.debug(f"Created {len(points)} points for indexing")
-        await client.upsert(collection_name=COLL, points=points)
-        logger.info(f"Successfully indexed {len(points)} chunks")
+        logger.debug("Created {} points for indexing", len(ids))
+        # Column-oriented Batch avoids building one PointStruct model per chunk.
+        # Large crawls are split into batches upserted concurrently; wait=True
+        # keeps the points searchable for the retrieve() that follows
+        await asyncio.gather(*(
+            client.upsert(
+                collection_name=COLL,
+                points=Batch(
+                    ids=ids[i:i + UPSERT_BATCH_SIZE],
+                    vectors=vecs[i:i + UPSERT_BATCH_SIZE],  # Gemini embeddings are already lists
+                    payloads=payloads[i:i + UPSERT_BATCH_SIZE],
+                ),
+                wait=True,
+            )
+            for i in range(0, len(ids), UPSERT_BATCH_SIZE)
+        ))
+        logger.info(f"Successfully indexed {len(ids)} chunks")
         
     except Exception as e:
         logger.error(f"Error indexing chunks: {e}")
@@ -139,18 +283,23 @@ async def retrieve(query: str, query_id: str, top_k: int = 8):
         qv = await encode_text_async(query)
         
         flt = Filter(must=[FieldCondition(key="query_id", match=MatchValue(value=query_id))])
-        logger.debug(f"Searching in collection '{COLL}' with filter")
+        logger.debug("Searching in collection '{}' with filter", COLL)
         
-        hits = await client.search(
+        response = await client.query_points(
             collection_name=COLL,
-            query_vector=qv,  # Gemini embeddings are already lists
+            query=qv,  # Gemini embeddings are already lists
             limit=top_k,
             query_filter=flt,
+            search_params=QUERY_SEARCH_PARAMS,
+            with_payload=True,
         )
+        hits = response.points
         
         logger.info(f"Retrieved {len(hits)} chunks from vector search")
-        for i, hit in enumerate(hits):
-            logger.debug(f"Hit {i+1}: score={hit.score:.4f}, url={hit.payload.get('url', 'N/A')}")
+        logger.opt(lazy=True).debug(
+            "Hits (score, url): {}",
+            lambda: [(round(hit.score, 4), hit.payload.get("url", "N/A")) for hit in hits],
+        )
             
         return hits
         
@@ -159,6 +308,30 @@ async def retrieve(query: str, query_id: str, top_k: int = 8):
         raise
 
 
+async def retrieve_batch(queries: list[str], query_id: str, top_k: int = 8):
+    """Recupera *top_k* chunks para cada consulta em *queries* numa única ida ao Qdrant."""
+    logger.info(f"Retrieving top {top_k} chunks for {len(queries)} queries, query_id: {query_id}")
+
+    try:
+        logger.debug("Encoding queries for batched vector search with Gemini")
+        qvs = await encode_texts_async(queries)
+
+        flt = Filter(must=[FieldCondition(key="query_id", match=MatchValue(value=query_id))])
+        requests = [
+            QueryRequest(query=qv, filter=flt, limit=top_k, params=QUERY_SEARCH_PARAMS, with_payload=True)
+            for qv in qvs
+        ]
+
+        responses = await client.query_batch_points(collection_name=COLL, requests=requests)
+        results = [response.points for response in responses]
+        logger.info(f"Retrieved {sum(len(hits) for hits in results)} chunks from batched vector search")
+        return results
+
+    except Exception as e:
+        logger.error(f"Error retrieving chunks in batch: {e}")
+        raise
+
+
 async def cleanup_old_chunks(max_age_hours: int = 24):
     """Remove chunks older than max_age_hours from the collection."""
     logger.info(f"Starting cleanup of chunks older than {max_age_hours} hours")
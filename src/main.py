@@ -1,16 +1,46 @@
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
+from loguru import logger
+import asyncio
 import os
 
 from src.api.v1.web_search import router as web_search_router
+from src.services.crawl_client import close_http_client as close_crawl_client
+from src.services.searx_client import close_http_client as close_searx_client
+from src.helpers.vectorstore import encode_text_async, ensure_collection
+from src.services.search_service import periodic_cleanup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Aquece conexões (Gemini e Qdrant) fora do caminho da primeira requisição
+    results = await asyncio.gather(
+        encode_text_async("warmup"),
+        ensure_collection(),
+        return_exceptions=True,
+    )
+    for name, result in zip(("Gemini embeddings", "Qdrant collection"), results):
+        if isinstance(result, Exception):
+            logger.warning(f"Startup warmup failed for {name}: {result}")
+    # Limpeza da coleção numa única tarefa periódica, fora do caminho das requisições
+    cleanup_task = asyncio.create_task(periodic_cleanup())
+    yield
+    cleanup_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await cleanup_task
+    # Libera as conexões HTTP compartilhadas
+    await asyncio.gather(close_crawl_client(), close_searx_client())
+
 
 app = FastAPI(
     title="Web Search Tool API", 
     version="0.1.0",
     description="API para ferramentas de busca web e agentes inteligentes",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 app.include_router(web_search_router) 
@@ -28,5 +58,10 @@ async def get_swagger_json():
     """Endpoint para acessar diretamente o JSON do Swagger"""
     swagger_path = "docs/swagger/swagger.json"
     if os.path.exists(swagger_path):
-        return FileResponse(swagger_path, media_type="application/json")
+        return FileResponse(
+            swagger_path,
+            media_type="application/json",
+            # Cached copies must revalidate (ETag/Last-Modified) so a deploy is seen at once
+            headers={"Cache-Control": "no-cache"},
+        )
     return {"error": "Documentação Swagger não encontrada"}
\ No newline at end of file
@@ -1,13 +1,72 @@
+import asyncio
 import httpx
+import orjson
+from cachetools import TTLCache
 from typing import Dict
+from urllib.parse import urlsplit
+from weakref import WeakValueDictionary
 from loguru import logger
 
-from src.config.env import CRAWL_URL
+from src.config.env import CRAWL_URL, CRAWL_CONCURRENCY
+
+# Semaphore to limit concurrent crawling operations (tune to the Crawl4AI backend)
+CRAWL_SEMAPHORE = asyncio.Semaphore(CRAWL_CONCURRENCY)
+
+# Per-site limit so several results from one host are not fetched all at once.
+# Weak values: a host's semaphore is dropped once no crawl is using it.
+CRAWL_PER_HOST_CONCURRENCY = 2
+_host_semaphores: WeakValueDictionary[str, asyncio.Semaphore] = WeakValueDictionary()
+
+
+def _host_semaphore(url: str) -> asyncio.Semaphore:
+    """Return the semaphore limiting concurrent crawls of *url*'s host"""
+    host = urlsplit(url).netloc
+    sem = _host_semaphores.get(host)
+    if sem is None:
+        sem = _host_semaphores[host] = asyncio.Semaphore(CRAWL_PER_HOST_CONCURRENCY)
+    return sem
+
+# Recent successful crawls by URL; many searches share the same top results.
+# The crawl payload is fixed, so the URL alone identifies the result.
+CRAWL_CACHE_SIZE = 1024
+CRAWL_CACHE_TTL = 600  # seconds
+_crawl_cache: TTLCache = TTLCache(maxsize=CRAWL_CACHE_SIZE, ttl=CRAWL_CACHE_TTL)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Result fields holding page content, in order of preference
+CONTENT_KEYS = ("markdown", "cleaned_html", "extracted_content", "content")
+
+# Shared HTTP client: keeps keep-alive connections to Crawl4AI across calls.
+# HTTP/2 (negotiated over TLS) multiplexes concurrent crawls on one connection;
+# plain-http endpoints keep using the HTTP/1.1 keep-alive pool.
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared Crawl4AI HTTP client, creating it on first use"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60.0)
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client (called on application shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 
 async def crawl_markdown(url: str) -> Dict:
     """Crawl URL using external Crawl4AI service"""
     logger.info(f"Crawling URL: {url}")
-    logger.debug(f"Crawl4AI URL: {CRAWL_URL}")
+    logger.debug("Crawl4AI URL: {}", CRAWL_URL)
     
     payload = {
         "url": url,
@@ -17,57 +76,48 @@ async def crawl_markdown(url: str) -> Dict:
     }
     
     try:
-        async with httpx.AsyncClient(
-            timeout=httpx.Timeout(30.0, connect=5.0),
-            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
-        ) as client:
-            logger.debug(f"Making crawl request with payload: {payload}")
-            
-            r = await client.post(CRAWL_URL, json=payload)
-            logger.info(f"Crawl response status for {url}: {r.status_code}")
-            
-            r.raise_for_status()
-            response_data = r.json()
-            logger.debug(f"Response keys: {list(response_data.keys())}")
-            
-            # Extract content - try different possible response formats
-            markdown_content = ""
-            result = response_data
-            
-            # If it has results array, use first result
-            if "results" in response_data and len(response_data["results"]) > 0:
-                result = response_data["results"][0]
-            
-            # Try to get markdown content
-            markdown_content = result.get("markdown", "")
-            
-            # If main markdown is empty or too short, try alternatives
-            if not markdown_content or len(str(markdown_content).strip()) < 50:
-                markdown_content = result.get("cleaned_html", "")
-                if not markdown_content or len(str(markdown_content).strip()) < 50:
-                    markdown_content = result.get("extracted_content", "")
-                    if not markdown_content or len(str(markdown_content).strip()) < 50:
-                        markdown_content = result.get("content", "")
-            
+        client = get_http_client()
+        logger.debug("Making crawl request with payload: {}", payload)
+        
+        # Serialized with orjson instead of httpx's stdlib json encoding
+        r = await client.post(CRAWL_URL, content=orjson.dumps(payload), headers=JSON_HEADERS)
+        logger.info(f"Crawl response status for {url}: {r.status_code}")
+        
+        r.raise_for_status()
+        # orjson parses the (often hundreds of KB) body straight from bytes
+        response_data = orjson.loads(r.content)
+        logger.opt(lazy=True).debug("Response keys: {}", lambda: list(response_data))
+        
+        # Extract content - try different possible response formats
+        # If it has results array, use first result
+        results = response_data.get("results")
+        result = results[0] if results else response_data
+        
+        # Take the first field with enough content (markdown first); if none
+        # qualifies, the last candidate is kept and rejected below
+        for key in CONTENT_KEYS:
+            markdown_content = result.get(key, "")
             # Ensure content is string
             if not isinstance(markdown_content, str):
                 markdown_content = str(markdown_content) if markdown_content else ""
-            
             content_length = len(markdown_content.strip())
-            logger.info(f"Crawled {url}: {content_length} chars of content")
-            
-            if content_length < 50:
-                logger.warning(f"Content too short for {url}, response: {response_data}")
-                markdown_content = ""
-            
-            return {
-                "url": url,
-                "markdown": markdown_content,
-                "content": markdown_content,  # Alias for backward compatibility
-                "success": result.get("success", content_length > 0),
-                "status_code": result.get("status_code", 200),
-                "error_message": result.get("error_message", "")
-            }
+            if content_length >= 50:
+                break
+        
+        logger.info(f"Crawled {url}: {content_length} chars of content")
+        
+        if content_length < 50:
+            logger.warning(f"Content too short for {url}, response: {response_data}")
+            markdown_content = ""
+        
+        return {
+            "url": url,
+            "markdown": markdown_content,
+            "content": markdown_content,  # Alias for backward compatibility
+            "success": result.get("success", content_length > 0),
+            "status_code": result.get("status_code", 200),
+            "error_message": result.get("error_message", "")
+        }
         
     except httpx.TimeoutException as e:
         logger.error(f"Timeout crawling {url}: {e}")
@@ -96,3 +146,20 @@ async def crawl_markdown(url: str) -> Dict:
             "status_code": 0,
             "error_message": str(e)
         }
+
+
+async def limited_crawl_markdown(url: str) -> Dict:
+    """Crawl with concurrency limit, serving recent successful crawls from memory"""
+    cached = _crawl_cache.get(url)
+    if cached is not None:
+        logger.debug("Crawl cache hit for {}", url)
+        # Copy, so callers can never alter the cached entry
+        return dict(cached)
+
+    # Host slot first, so crawls queued behind a busy site do not hold global slots
+    async with _host_semaphore(url), CRAWL_SEMAPHORE:
+        result = await crawl_markdown(url)
+    # Failures and empty pages are retried on the next search
+    if result["markdown"]:
+        _crawl_cache[url] = dict(result)
+    return result
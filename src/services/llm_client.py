@@ -1,7 +1,6 @@
 from typing import List
 from google import genai
 from google.genai.types import GenerateContentConfig
-from pydantic import BaseModel
 from loguru import logger
 
 from src.config.env import GEMINI_API_KEY
@@ -9,11 +8,33 @@ from src.config.env import GEMINI_API_KEY
 MODEL_NAME = "gemini-2.5-flash"
 
 
-class Response(BaseModel):
-    content: str
-    
+# Built once at import; identical for every request
+SYSTEM_PROMPT = [
+    "Você é um assistente que compila resultados de busca para outro agente de IA.",
+    "Use APENAS o contexto fornecido. Responda em português claro e objetivo.",
+    "O resultado deve ser bem completo, com informações relevantes e detalhadas.",
+    "Quanto mais detalhado, melhor.",
+    "Forneça instruções quando necessário.",
+    "Você precisa compilar o contexto recebido para dar uma resposta completa e detalhada, rica em instruções, informações de como fazer, como resolver e como atender a pergunta do usuário.",
+    "Se o usuário perguntar sobre um assunto que não está no contexto, você deve dizer que não tem informações sobre o assunto."
+    "Insira links e referências para as informações que você fornecer."
+]
+
+# Plain-text output: the markdown answer is used as-is, with no JSON envelope to decode
+CONFIG = GenerateContentConfig(
+    response_mime_type="text/plain",
+    system_instruction=SYSTEM_PROMPT,
+)
+
+# Shared Gemini client: reuses its HTTP connections across summarize calls
+_client: genai.Client | None = None
+
 def get_client():
-    return genai.Client(api_key=GEMINI_API_KEY)
+    """Return the shared Gemini client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = genai.Client(api_key=GEMINI_API_KEY)
+    return _client
 
 async def summarize(context: str, query: str, sources: List[str]) -> str:
     logger.info(f"Starting LLM summarization for query: '{query}'")
@@ -25,29 +46,11 @@ async def summarize(context: str, query: str, sources: List[str]) -> str:
     
     try:
         client = get_client()
-        logger.debug("Gemini client created successfully")
-        
-        system_prompt = [
-            "Você é um assistente que compila resultados de busca para outro agente de IA.",
-            "Use APENAS o contexto fornecido. Responda em português claro e objetivo.",
-            "O resultado deve ser bem completo, com informações relevantes e detalhadas.",
-            "Quanto mais detalhado, melhor.",
-            "Forneça instruções quando necessário.",
-            "Você precisa compilar o contexto recebido para dar uma resposta completa e detalhada, rica em instruções, informações de como fazer, como resolver e como atender a pergunta do usuário.",
-            "Se o usuário perguntar sobre um assunto que não está no contexto, você deve dizer que não tem informações sobre o assunto."
-            "Insira links e referências para as informações que você fornecer."
-        ]
-        
-        config = GenerateContentConfig(
-            response_schema=Response,
-            response_mime_type="application/json",
-            system_instruction=system_prompt,
-        )
         
-        logger.debug(f"Making request to Gemini model: {MODEL_NAME}")
+        logger.debug("Making request to Gemini model: {}", MODEL_NAME)
         response = await client.aio.models.generate_content(
             model=MODEL_NAME,
-            config=config,
+            config=CONFIG,
             contents=[
                 {
                     "role": "user",
@@ -1,23 +1,23 @@
-import re, asyncio, json, uuid
+import re, asyncio, uuid
 from typing import List
 from loguru import logger
 
-from src.models.web_search_model import WebSearchRequest, WebSearchResponse
+from src.models.web_search_model import WebSearchRequest, WebSearchResponse, WebSearchContextResponse, ContextSnippet
 from src.services.searx_client import searx_search
-from src.services.crawl_client import crawl_markdown
+from src.services.crawl_client import limited_crawl_markdown
 from src.helpers.chunk_breaker import chunk_markdown
 from src.helpers.vectorstore import ensure_collection, index_chunks, retrieve, cleanup_old_chunks, get_collection_stats
 from src.services.llm_client import summarize
 
-URL_REGEX = re.compile(r"^\*\s+(https?://\S+)")
+# A whole "* http..." source line, newline included; findall/sub scan the answer
+# once in C instead of splitting it into lines
+URL_REGEX = re.compile(r"^[ \t]*\*[ \t]+(https?://\S+).*\n?", re.MULTILINE)
 
-# Semaphore to limit concurrent crawling operations
-CRAWL_SEMAPHORE = asyncio.Semaphore(5)  # Max 5 concurrent crawls
+# Upper bound on the context sent to the LLM (~6k tokens)
+MAX_CONTEXT_CHARS = 24_000
 
-async def limited_crawl_markdown(url: str):
-    """Crawl with concurrency limit"""
-    async with CRAWL_SEMAPHORE:
-        return await crawl_markdown(url)
+# Seconds between collection size checks by periodic_cleanup()
+CLEANUP_INTERVAL = 600
 
 
 async def _background_cleanup_if_needed():
@@ -32,34 +32,112 @@ async def _background_cleanup_if_needed():
         logger.error(f"Background cleanup failed: {e}")
 
 
+async def periodic_cleanup(interval: int = CLEANUP_INTERVAL):
+    """Check the collection every *interval* seconds until cancelled (started by the app lifespan)."""
+    while True:
+        await asyncio.sleep(interval)
+        await _background_cleanup_if_needed()
+
+
+async def _crawl_and_chunk(url: str) -> List[str] | None:
+    """Crawl *url* and split it into candidate chunk texts.
+
+    Returns None when the page has no usable content.
+    """
+    res = await limited_crawl_markdown(url)
+    # crawl_markdown always sets "markdown"; "content" is only an alias of it
+    md = res.get("markdown") or ""
+
+    # Ensure md is a string
+    if not isinstance(md, str):
+        logger.warning(f"Content for {url} is not a string: {type(md)}, value: {md}")
+        return None
+
+    logger.debug("Content length for {}: {} chars", url, len(md))
+
+    # The raw length bounds the stripped one, so short pages skip the strip() copy
+    if len(md) < 300 or len(md.strip()) < 300:
+        logger.warning(f"Content too short for {url}: {len(md.strip())} chars")
+        return None
+
+    try:
+        chunks = await chunk_markdown(md)
+    except Exception as e:
+        logger.error(f"Error chunking content for {url}: {e}")
+        return []
+    logger.debug("Generated {} chunks for {}", len(chunks), url)
+
+    texts = []
+    for c in chunks:
+        # Ensure c is a string
+        if not isinstance(c, str):
+            logger.warning(f"Chunk is not a string for {url}: {type(c)}, value: {c}")
+            continue
+        if len(c) < 200:
+            continue
+        txt = c.strip()
+        if len(txt) >= 200:
+            texts.append(txt)
+    return texts
+
+
+async def _crawl_and_index(urls: List[str], titles: List[str], query_id: str) -> tuple[int, int]:
+    """Crawl and chunk every URL, then index the unique chunks under *query_id*.
+
+    Each page is chunked as soon as its own crawl returns, overlapping the
+    slower crawls. Dedup follows the search rank order, so the indexed set does
+    not depend on crawl timing, and all chunks are embedded and upserted in one
+    batched index_chunks call. Returns (valid docs, indexed chunks); raises if
+    indexing failed.
+    """
+    # Collection setup does not depend on the crawl results, so overlap them
+    page_texts, _ = await asyncio.gather(
+        asyncio.gather(*(_crawl_and_chunk(url) for url in urls)),
+        ensure_collection(),
+    )
+
+    valid_docs = 0
+    seen_texts: set[str] = set()
+    all_chunks = []
+    for url, title, texts in zip(urls, titles, page_texts):
+        if texts is None:
+            continue
+        valid_docs += 1
+        for txt in texts:
+            if txt in seen_texts:
+                continue
+            seen_texts.add(txt)
+            all_chunks.append({"url": url, "title": title, "text": txt})
+
+    if all_chunks:
+        await index_chunks(all_chunks, query_id)
+    return valid_docs, len(all_chunks)
+
+
+def _build_context(hits) -> str:
+    """Join hit texts, best score first, until MAX_CONTEXT_CHARS is reached.
+
+    The top hit is always kept, even if it alone exceeds the budget.
+    """
+    ctx_chunks = []
+    total = 0
+    for h in sorted(hits, key=lambda h: h.score, reverse=True):
+        text = h.payload["text"]
+        total += len(text) + 2  # "\n\n" separator
+        if ctx_chunks and total > MAX_CONTEXT_CHARS:
+            break
+        ctx_chunks.append(text)
+    return "\n\n".join(ctx_chunks)
+
+
 async def _extract_sources(text: str, fallback: List[str] | None = None) -> tuple[str, List[str]]:
     """Extrai fontes (linhas iniciadas com * http) e devolve corpo limpo."""
-    if text.lstrip().startswith("{"):
-        try:
-            data = json.loads(text)
-            if isinstance(data, dict) and "content" in data:
-                text = str(data["content"])
-        except json.JSONDecodeError:
-            pass
-    sources = []
-    lines = []
-    for line in text.splitlines():
-        m = URL_REGEX.match(line.strip())
-        if m:
-            sources.append(m.group(1))
-        else:
-            lines.append(line)
+    sources = URL_REGEX.findall(text)
     if not sources and fallback:
         sources = fallback[:4]
-    seen = set()
-    deduped = []
-    for url in sources:
-        if url not in seen:
-            deduped.append(url)
-            seen.add(url)
-        if len(deduped) >= 8:
-            break
-    summary = "\n".join(lines).strip()
+    # Order-preserving dedup
+    deduped = list(dict.fromkeys(sources))[:8]
+    summary = URL_REGEX.sub("", text).strip()
     return summary, deduped
 
 
@@ -78,71 +156,21 @@ async def web_search(request: WebSearchRequest) -> WebSearchResponse:
         top_titles = [r["title"] for r in results]
         logger.info(f"URLs to crawl: {top_urls}")
         
-        crawled = await asyncio.gather(*(limited_crawl_markdown(u) for u in top_urls), return_exceptions=True)
-        logger.info(f"Crawling completed. Results: {len(crawled)} items")
+        query_id = str(uuid.uuid4())
+        logger.info(f"Generated query ID: {query_id}")
 
-        markdown_docs = []
-        for i, (url, res, title) in enumerate(zip(top_urls, crawled, top_titles)):
-            if isinstance(res, Exception):
-                logger.warning(f"Crawling failed for {url}: {res}")
-                continue
-            
-            md = res.get("markdown") or res.get("content") or ""
-            
-            # Ensure md is a string
-            if not isinstance(md, str):
-                logger.warning(f"Content for {url} is not a string: {type(md)}, value: {md}")
-                continue
-                
-            logger.debug(f"Content length for {url}: {len(md)} chars")
-            
-            if len(md.strip()) < 300:
-                logger.warning(f"Content too short for {url}: {len(md.strip())} chars")
-                continue
-            markdown_docs.append({"url": url, "title": title, "markdown": md})
+        try:
+            valid_docs, total_chunks = await _crawl_and_index(top_urls, top_titles, query_id)
+        except Exception as e:
+            logger.error(f"Error indexing chunks: {e}")
+            return WebSearchResponse(summary="Erro ao indexar conteúdo.", sources=[])
 
-        logger.info(f"Valid markdown docs: {len(markdown_docs)}")
-        if not markdown_docs:
+        logger.info(f"Valid markdown docs: {valid_docs}")
+        if not valid_docs:
             logger.error("No valid markdown documents after crawling")
             return WebSearchResponse(summary="Não encontrei informação suficiente.", sources=[])
 
-        await ensure_collection()
-        logger.info("Vector collection ensured")
-        
-        # Schedule background cleanup (non-blocking)
-        asyncio.create_task(_background_cleanup_if_needed())
-        
-        query_id = str(uuid.uuid4())
-        logger.info(f"Generated query ID: {query_id}")
-        
-        seen_texts: set[str] = set()
-        all_chunks = []
-        for doc in markdown_docs:
-            try:
-                chunks = await chunk_markdown(doc["markdown"])
-                logger.debug(f"Generated {len(chunks)} chunks for {doc['url']}")
-                for c in chunks:
-                    # Ensure c is a string
-                    if not isinstance(c, str):
-                        logger.warning(f"Chunk is not a string for {doc['url']}: {type(c)}, value: {c}")
-                        continue
-                    txt = c.strip()
-                    if len(txt) < 200 or txt in seen_texts:
-                        continue
-                    seen_texts.add(txt)
-                    all_chunks.append({"url": doc["url"], "title": doc["title"], "text": txt})
-            except Exception as e:
-                logger.error(f"Error chunking content for {doc['url']}: {e}")
-
-        logger.info(f"Total unique chunks: {len(all_chunks)}")
-        
-        if all_chunks:
-            try:
-                await index_chunks(all_chunks, query_id)
-                logger.info(f"Indexed {len(all_chunks)} chunks")
-            except Exception as e:
-                logger.error(f"Error indexing chunks: {e}")
-                return WebSearchResponse(summary="Erro ao indexar conteúdo.", sources=[])
+        logger.info(f"Indexed {total_chunks} unique chunks")
 
         try:
             hits = await retrieve(request.query, query_id, top_k=8)
@@ -152,8 +180,7 @@ async def web_search(request: WebSearchRequest) -> WebSearchResponse:
                 logger.warning("No relevant chunks found in vector search")
                 return WebSearchResponse(summary="Não encontrei informação relevante.", sources=top_urls[:3])
 
-            ctx_chunks = [h.payload["text"] for h in hits]
-            context = "\n\n".join(ctx_chunks)
+            context = _build_context(hits)
             logger.info(f"Context length: {len(context)} chars")
 
             raw_answer = await summarize(context, request.query, top_urls)
@@ -181,51 +208,15 @@ async def web_search_context(request: WebSearchRequest):
     top_urls = [r["url"] for r in results]
     top_titles = [r["title"] for r in results]
 
-    crawled = await asyncio.gather(*(limited_crawl_markdown(u) for u in top_urls), return_exceptions=True)
-
-    markdown_docs = []
-    for url, res, title in zip(top_urls, crawled, top_titles):
-        if isinstance(res, Exception):
-            continue
-        md = res.get("markdown") or res.get("content") or ""
-        
-        # Ensure md is a string
-        if not isinstance(md, str):
-            continue
-
-        if len(md.strip()) < 300:
-            continue
-        markdown_docs.append({"url": url, "title": title, "markdown": md})
-
-    if not markdown_docs:
-        from src.models.web_search_model import WebSearchContextResponse
-
-        return WebSearchContextResponse(snippets=[])
-
-    await ensure_collection()
     query_id = str(uuid.uuid4())
 
-    seen_texts: set[str] = set()
-    all_chunks = []
-    for doc in markdown_docs:
-        chunks = await chunk_markdown(doc["markdown"])
-        for c in chunks:
-            # Ensure c is a string
-            if not isinstance(c, str):
-                continue
-            txt = c.strip()
-            if len(txt) < 200 or txt in seen_texts:
-                continue
-            seen_texts.add(txt)
-            all_chunks.append({"url": doc["url"], "title": doc["title"], "text": txt})
+    valid_docs, _ = await _crawl_and_index(top_urls, top_titles, query_id)
 
-    if all_chunks:
-        await index_chunks(all_chunks, query_id)
+    if not valid_docs:
+        return WebSearchContextResponse(snippets=[])
 
     hits = await retrieve(request.query, query_id, top_k=8)
 
-    from src.models.web_search_model import WebSearchContextResponse, ContextSnippet
-
     snippets: list[ContextSnippet] = []
     for h in hits:
         pl = h.payload or {}
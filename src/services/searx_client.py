@@ -1,12 +1,50 @@
+import heapq
 import httpx
+import orjson
+from cachetools import TTLCache
 from typing import List, Dict
 from loguru import logger
 
 from src.config.env import SEARX_URL
 
+# Recent searches by (query, k, lang): repeated questions skip the SearXNG round trip
+SEARCH_CACHE_SIZE = 256
+SEARCH_CACHE_TTL = 300  # seconds
+_search_cache: TTLCache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+
+# Shared HTTP client: keeps keep-alive connections to SearXNG across searches
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared SearXNG HTTP client, creating it on first use"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(15.0, connect=3.0),
+            limits=httpx.Limits(max_keepalive_connections=10, max_connections=50)
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client (called on application shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
 async def searx_search(query: str, k: int = 6, lang: str = "pt-BR") -> List[Dict]:
     logger.info(f"Searching SearX for query: '{query}', k={k}, lang={lang}")
-    logger.info(f"SearX URL: {SEARX_URL}")
+    logger.debug("SearX URL: {}", SEARX_URL)
+
+    cache_key = (query, k, lang)
+    cached = _search_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Returning {len(cached)} cached SearX results")
+        # Copies, so callers can never alter the cached entry
+        return [dict(res) for res in cached]
     
     params = {
         "q": query,
@@ -18,26 +56,27 @@ async def searx_search(query: str, k: int = 6, lang: str = "pt-BR") -> List[Dict
     
     try:
         # Use shared HTTP client with connection pooling
-        async with httpx.AsyncClient(
-            timeout=httpx.Timeout(15.0, connect=3.0),
-            limits=httpx.Limits(max_keepalive_connections=10, max_connections=50)
-        ) as cli:
-            logger.debug(f"Making request to SearX with params: {params}")
-            r = await cli.get(SEARX_URL, params=params)
-            logger.info(f"SearX response status: {r.status_code}")
+        cli = get_http_client()
+        logger.debug("Making request to SearX with params: {}", params)
+        r = await cli.get(SEARX_URL, params=params)
+        logger.info(f"SearX response status: {r.status_code}")
             
         r.raise_for_status()
-        data = r.json()
+        data = orjson.loads(r.content)
         results = data.get("results", [])
         logger.info(f"SearX returned {len(results)} raw results")
         
-        results = sorted(results, key=lambda x: x.get("score", 0), reverse=True)
-        final_results = results[:k]
+        # Only the top k are needed: partial heap selection instead of a full sort
+        final_results = heapq.nlargest(k, results, key=lambda x: x.get("score", 0))
         logger.info(f"Returning top {len(final_results)} results")
-        
-        for i, result in enumerate(final_results):
-            logger.debug(f"Result {i+1}: {result.get('title', 'No title')} - {result.get('url', 'No URL')}")
-            
+        logger.opt(lazy=True).debug(
+            "Results (title, url): {}",
+            lambda: [(res.get("title", "No title"), res.get("url", "No URL")) for res in final_results],
+        )
+
+        # Errors raise above and empty answers are retried, so neither is cached
+        if final_results:
+            _search_cache[cache_key] = [dict(res) for res in final_results]
         return final_results
         
     except httpx.TimeoutException as e:
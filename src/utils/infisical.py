@@ -5,7 +5,7 @@ from pathlib import Path
 from loguru import logger
 
 
-_env_cache: Dict[str, str] = {}
+_env_cache: Dict[str, str] | None = None
 
 
 def _load_dotenv() -> Dict[str, str]:
@@ -16,12 +16,13 @@ def _load_dotenv() -> Dict[str, str]:
     """
     global _env_cache
 
-    if _env_cache:
+    if _env_cache is not None:
         return _env_cache
 
     env_path = Path(".env")
     if not env_path.exists():
-        return {}
+        _env_cache = {}
+        return _env_cache
 
     env_vars = {}
     with open(env_path, "r") as f: